@@ -30,7 +30,7 @@ def say_stuff(something):
 
 @when('look')
 def look():
-    print(current_room.current_state.description)
+    print(str(current_room))
 
 
 @when('turn THING STATE')
@@ -58,4 +58,5 @@ def turn_on_off(thing, state):
         print(f'I don\'t know what {thing} is!')
     look()
 
-start(help=False)
+if __name__ == '__main__':
+    start(help=False)
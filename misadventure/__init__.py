@@ -1,7 +1,13 @@
+import misadventure.events
+import misadventure.template
 import misadventure.bag
 import misadventure.room
 import misadventure.item
 import misadventure.lib
+import misadventure.session
+import misadventure.shard
+import misadventure.threaded
+import misadventure.server
 
 __author__ = 'yonderbread'
 __version__ = '1.0.0'
@@ -1,5 +1,8 @@
 import random
 
+import misadventure.events as events
+from misadventure.lib import _leaf_locked
+
 
 class Bag(set):
     """A collection of Items, such as in an inventory.
@@ -8,17 +11,154 @@ class Bag(set):
     accept a str item name, and there is a ``take()`` method to remove an item
     by name.
 
+    Every way of adding or removing items, including the set methods such as
+    ``update()``, ``clear()`` and ``-=``, emits ItemAdded and ItemRemoved
+    events.
+
     """
 
+    def add(self, item):
+        """Put an Item in the bag."""
+        with _leaf_locked(self):
+            if set.__contains__(self, item):
+                return
+            set.add(self, item)
+            self._changed()
+        events.emit(events.ItemAdded(self, item))
+
+    def remove(self, item):
+        """Remove an Item from the bag, raising KeyError if it is missing."""
+        if not self._discard(item):
+            raise KeyError(item)
+        events.emit(events.ItemRemoved(self, item))
+
+    def discard(self, item):
+        """Remove an Item from the bag if it is present."""
+        if self._discard(item):
+            events.emit(events.ItemRemoved(self, item))
+
+    def _discard(self, item):
+        """Remove an Item without emitting an event; return True if it was there."""
+        with _leaf_locked(self):
+            if not set.__contains__(self, item):
+                return False
+            set.remove(self, item)
+            self._changed()
+        return True
+
+    def update(self, *others):
+        """Put all the Items from other collections in the bag."""
+        with _leaf_locked(self):
+            added = []
+            for other in others:
+                for item in list(other):
+                    if not set.__contains__(self, item):
+                        set.add(self, item)
+                        added.append(item)
+            if added:
+                self._changed()
+        self._emit(added, ())
+
+    def difference_update(self, *others):
+        """Remove all the Items that are in other collections."""
+        with _leaf_locked(self):
+            removed = []
+            for other in others:
+                for item in list(other):
+                    if set.__contains__(self, item):
+                        set.remove(self, item)
+                        removed.append(item)
+            if removed:
+                self._changed()
+        self._emit((), removed)
+
+    def intersection_update(self, *others):
+        """Remove all the Items that are not in every other collection."""
+        with _leaf_locked(self):
+            keep = set.intersection(set(self), *others)
+            removed = [item for item in list(self) if item not in keep]
+            if removed:
+                set.difference_update(self, removed)
+                self._changed()
+        self._emit((), removed)
+
+    def symmetric_difference_update(self, other):
+        """Remove the Items that are in `other` and add the ones that aren't."""
+        added, removed = [], []
+        with _leaf_locked(self):
+            for item in set(other):
+                if set.__contains__(self, item):
+                    set.remove(self, item)
+                    removed.append(item)
+                else:
+                    set.add(self, item)
+                    added.append(item)
+            if added or removed:
+                self._changed()
+        self._emit(added, removed)
+
+    def pop(self):
+        """Remove and return an arbitrary Item, raising KeyError if empty."""
+        with _leaf_locked(self):
+            item = set.pop(self)
+            self._changed()
+        events.emit(events.ItemRemoved(self, item))
+        return item
+
+    def clear(self):
+        """Remove every Item from the bag."""
+        with _leaf_locked(self):
+            removed = list(self)
+            set.clear(self)
+            if removed:
+                self._changed()
+        self._emit((), removed)
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __isub__(self, other):
+        self.difference_update(other)
+        return self
+
+    def __iand__(self, other):
+        self.intersection_update(other)
+        return self
+
+    def __ixor__(self, other):
+        self.symmetric_difference_update(other)
+        return self
+
+    def _emit(self, added, removed):
+        for item in added:
+            events.emit(events.ItemAdded(self, item))
+        for item in removed:
+            events.emit(events.ItemRemoved(self, item))
+
+    def snapshot(self):
+        """Return a frozenset of the Items, taken while no one can change them."""
+        with _leaf_locked(self):
+            return frozenset(self)
+
+    @property
+    def version(self):
+        """A number that goes up every time an item is added or removed."""
+        return self.__dict__.get('_version', 0)
+
+    def _changed(self):
+        self._version = self.version + 1
+
     def find(self, name):
         """Find an object in the bag by name, but do not remove it.
 
         Return None if the name does not match.
 
         """
-        for item in self:
-            if name.lower() in item.aliases:
-                return item
+        with _leaf_locked(self):
+            for item in self:
+                if name.lower() in item.aliases:
+                    return item
         return None
 
     def __contains__(self, v):
@@ -41,9 +181,12 @@ class Bag(set):
         Return None if no item matches the name.
 
         """
-        obj = self.find(name)
+        with _leaf_locked(self):
+            obj = self.find(name)
+            if obj is not None:
+                self._discard(obj)
         if obj is not None:
-            self.remove(obj)
+            events.emit(events.ItemRemoved(self, obj))
         return obj
 
     def get_random(self):
@@ -52,12 +195,13 @@ class Bag(set):
         Return None if the bag is empty.
 
         """
-        if not self:
-            return None
-        which = random.randrange(len(self))
-        for index, obj in enumerate(self):
-            if index == which:
-                return obj
+        with _leaf_locked(self):
+            if not self:
+                return None
+            which = random.randrange(len(self))
+            for index, obj in enumerate(self):
+                if index == which:
+                    return obj
 
     def take_random(self):
         """Remove an Item from the bag at random, and return it.
@@ -65,9 +209,12 @@ class Bag(set):
         Return None if the bag is empty.
 
         """
-        obj = self.get_random()
+        with _leaf_locked(self):
+            obj = self.get_random()
+            if obj is not None:
+                self._discard(obj)
         if obj is not None:
-            self.remove(obj)
+            events.emit(events.ItemRemoved(self, obj))
         return obj
 
 
@@ -0,0 +1,256 @@
+import threading
+import weakref
+from contextlib import contextmanager
+
+#: Subscribers keyed by event type, then by id() of the room they watch
+#: (or None for every room), in the order they subscribed
+_subscribers = {}
+_subscribers_lock = threading.Lock()
+
+#: Weak references to the objects that contain another one, by id() of the
+#: contained object, such as the RoomState holding a Bag
+_parents = {}
+
+_local = threading.local()
+
+
+class Event:
+    """Something that happened to the game world.
+
+    Events about the same thing that happen during one command are coalesced
+    into one, so subscribers only see the net change.
+
+    """
+
+    #: The room or bag the event is about, used to find subscribers
+    subject = None
+
+    def key(self):
+        """Return a key shared by events that can be coalesced with this one.
+
+        Return None if the event should never be coalesced.
+
+        """
+        return None
+
+    def merge(self, later):
+        """Combine this event with a later one that has the same key.
+
+        Return the combined event, or None if the two cancel out.
+
+        """
+        return later
+
+    def __repr__(self):
+        return '%s(%s)' % (
+            type(self).__name__,
+            ', '.join(
+                '%s=%r' % (k, v)
+                for k, v in vars(self).items()
+                if k != 'subject'
+            )
+        )
+
+
+class StateChanged(Event):
+    """A Room switched to a different RoomState."""
+
+    def __init__(self, room, old, new, name=None):
+        self.room = self.subject = room
+        self.old = old
+        self.new = new
+        self.name = name
+
+    def key(self):
+        return StateChanged, id(self.room)
+
+    def merge(self, later):
+        if later.new is self.old:
+            return None
+        return StateChanged(self.room, self.old, later.new, later.name)
+
+
+class ExitCreated(Event):
+    """An exit was made from a room to another room."""
+
+    def __init__(self, room, direction, target):
+        self.room = self.subject = room
+        self.direction = direction
+        self.target = target
+
+    def key(self):
+        return ExitCreated, id(self.room), self.direction
+
+
+class ItemEvent(Event):
+    """An Item was put in or taken out of a Bag.
+
+    Adding and then removing the same item cancel out.
+
+    """
+
+    def __init__(self, bag, item):
+        self.bag = self.subject = bag
+        self.item = item
+
+    def key(self):
+        return ItemEvent, id(self.bag), id(self.item)
+
+    def merge(self, later):
+        if type(later) is not type(self):
+            return None
+        return later
+
+
+class ItemAdded(ItemEvent):
+    """An Item was put in a Bag."""
+
+
+class ItemRemoved(ItemEvent):
+    """An Item was taken out of a Bag."""
+
+
+class ContextChanged(Event):
+    """The command context was changed with ``set_context()``."""
+
+    def __init__(self, old, new):
+        self.old = old
+        self.new = new
+
+    def key(self):
+        return (ContextChanged,)
+
+    def merge(self, later):
+        if later.new == self.old:
+            return None
+        return ContextChanged(self.old, later.new)
+
+
+def subscribe(event_type, handler, room=None):
+    """Call `handler` with a list of events of `event_type`.
+
+    If `room` is given, only events about that room are sent, including
+    events about its states and their bags. A RoomState or Bag can be given
+    to watch just that object. Subscribing to ``Event`` receives every event.
+
+    """
+    with _subscribers_lock:
+        by_room = _subscribers.setdefault(event_type, {})
+        by_room.setdefault(_room_key(room), []).append(handler)
+
+
+def unsubscribe(event_type, handler, room=None):
+    """Stop calling `handler` for `event_type`."""
+    with _subscribers_lock:
+        by_room = _subscribers.get(event_type, {})
+        handlers = by_room.get(_room_key(room), [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+
+def add_parent(child, parent):
+    """Also send events about `child` to the subscribers of `parent`."""
+    key = id(child)
+    with _subscribers_lock:
+        if key not in _parents:
+            _parents[key] = []
+            weakref.finalize(child, _parents.pop, key, None)
+        _parents[key].append(weakref.ref(parent))
+
+
+def on(event_type, room=None):
+    """Decorator for event subscribers."""
+
+    def dec(func):
+        subscribe(event_type, func, room)
+        return func
+
+    return dec
+
+
+def emit(event):
+    """Send an event to its subscribers.
+
+    Inside a ``batch()`` the event is held back and delivered when the batch
+    ends.
+
+    """
+    if not _subscribers:
+        return
+    pending = getattr(_local, 'pending', None)
+    if pending is None:
+        _dispatch([event])
+        return
+
+    key = event.key()
+    if key is None:
+        key = object()
+    earlier = pending.pop(key, None)
+    if earlier is not None:
+        event = earlier.merge(event)
+    if event is not None:
+        pending[key] = event
+
+
+@contextmanager
+def batch():
+    """Hold back events until the end of the block, then deliver them.
+
+    Each subscriber is called once, with every event it gets from the batch.
+    Nested batches are delivered when the outermost one ends. Events are
+    delivered even if the block raises, since the changes they describe have
+    already been made.
+
+    """
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+
+    _local.pending = {}
+    try:
+        yield
+    finally:
+        pending, _local.pending = _local.pending, None
+        if pending:
+            _dispatch(list(pending.values()))
+
+
+def _room_key(room):
+    return None if room is None else id(room)
+
+
+def _subject_keys(subject):
+    """Return the subscriber keys for an event about `subject`.
+
+    That is the subject itself, everything that contains it, and None for
+    subscribers to every room.
+
+    """
+    keys = [None]
+    stack = [subject]
+    while stack:
+        obj = stack.pop()
+        if obj is None or id(obj) in keys:
+            continue
+        keys.append(id(obj))
+        stack.extend(ref() for ref in _parents.get(id(obj), ()))
+    return keys
+
+
+def _dispatch(events):
+    """Call each interested subscriber once with its share of `events`."""
+    deliveries = {}
+    with _subscribers_lock:
+        for event in events:
+            rooms = _subject_keys(event.subject)
+            for event_type in type(event).__mro__:
+                by_room = _subscribers.get(event_type)
+                if not by_room:
+                    continue
+                for room in rooms:
+                    for handler in by_room.get(room, ()):
+                        entry = deliveries.setdefault(id(handler), (handler, []))
+                        if not entry[1] or entry[1][-1] is not event:
+                            entry[1].append(event)
+    for handler, received in deliveries.values():
+        handler(received)
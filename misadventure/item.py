@@ -1,11 +1,18 @@
 from misadventure.bag import LockedBag
+from misadventure.template import Template, render
 
 
 class Item:
-    """A generic item object that can be referred to by a number of names."""
+    """A generic item object that can be referred to by a number of names.
+
+    The description may be a plain string or a Template, which can refer to
+    the item's attributes.
+
+    """
 
     def __init__(self, name, *aliases):
         self.name = name
+        self.description = ''
         self.aliases = tuple(
             label.lower()
             for label in (name,) + aliases
@@ -20,6 +27,12 @@ class Item:
     def __str__(self):
         return self.name
 
+    def describe(self):
+        """Return the item's description, rendering it if it is a Template."""
+        if not isinstance(self.description, Template):
+            return self.description
+        return render(self.description, self, lambda name: getattr(self, name, None))
+
 
 class Key(Item):
     def __init__(self, name, keycode, *aliases):
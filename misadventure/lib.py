@@ -2,6 +2,11 @@ import inspect
 import re
 import sys
 import textwrap
+import threading
+import weakref
+from contextlib import contextmanager
+
+import misadventure.events as events
 
 try:
     from shutil import get_terminal_size
@@ -19,6 +24,19 @@ except ImportError:
 
 current_context = None
 
+#: Per-thread state, used when sessions are handled concurrently
+_local = threading.local()
+
+#: Guards changes to ``commands``
+_commands_lock = threading.RLock()
+
+#: Locks for game objects, keyed by id() and dropped with the object.
+#: ``_locks`` are taken by game code with ``locked()``; ``_leaf_locks`` are
+#: taken by the library itself around single operations on one object.
+_locks = {}
+_leaf_locks = {}
+_locks_guard = threading.Lock()
+
 #: The separator that defines the context hierarchy
 CONTEXT_SEP = '.'
 
@@ -77,14 +95,101 @@ def set_context(new_context):
     """
     global current_context
     _validate_context(new_context)
-    current_context = new_context
+    old_context = get_context()
+    if getattr(_local, 'bound', False):
+        _local.context = new_context
+    else:
+        current_context = new_context
+    if new_context != old_context:
+        events.emit(events.ContextChanged(old_context, new_context))
 
 
 def get_context():
     """Get the current command context."""
+    if getattr(_local, 'bound', False):
+        return _local.context
     return current_context
 
 
+@contextmanager
+def _bound_context(context):
+    """Give the current thread its own command context while active.
+
+    Inside the block, ``set_context()`` and ``get_context()`` only see the
+    context of this thread instead of the global one.
+
+    """
+    _validate_context(context)
+    outer = getattr(_local, 'bound', False), getattr(_local, 'context', None)
+    _local.bound, _local.context = True, context
+    try:
+        yield
+    finally:
+        _local.bound, _local.context = outer
+
+
+def _lock_in(table, obj):
+    """Return the reentrant lock for `obj` in `table`, creating it if needed."""
+    key = id(obj)
+    with _locks_guard:
+        lock = table.get(key)
+        if lock is None:
+            lock = table[key] = threading.RLock()
+            weakref.finalize(obj, table.pop, key, None)
+    return lock
+
+
+@contextmanager
+def _ordered(table, objs):
+    """Hold the locks in `table` of several objects, taken in id() order."""
+    unique = {id(obj): obj for obj in objs if obj is not None}
+    locks = [_lock_in(table, unique[key]) for key in sorted(unique)]
+    for lock in locks:
+        lock.acquire()
+    try:
+        yield
+    finally:
+        for lock in reversed(locks):
+            lock.release()
+
+
+def lock_of(obj):
+    """Return the reentrant lock guarding a game object such as a Room or Bag.
+
+    The lock is created the first time it is asked for.
+
+    """
+    return _lock_in(_locks, obj)
+
+
+@contextmanager
+def locked(*objs):
+    """Hold the locks of several game objects at once.
+
+    Locks are always taken in the same order, so two threads locking the same
+    rooms and bags in a different order cannot deadlock, as long as every
+    lock a command needs is taken in one call: do not nest ``locked()``
+    blocks or take ``lock_of()`` inside one.
+
+    The library's own methods, such as ``Bag.add()`` or linking exits, never
+    take these locks. They use separate internal locks that are only held for
+    a single operation and never while waiting for another lock, so they are
+    safe to call inside ``locked()``.
+
+    """
+    with _ordered(_locks, objs):
+        yield
+
+
+def _leaf_locked(*objs):
+    """Hold the library's internal locks of one or two game objects.
+
+    Nothing else may be locked, and no events emitted, while these are held.
+
+    """
+    return _ordered(_leaf_locks, objs)
+
+
 def _validate_context(context):
     """Raise an exception if the given context is invalid."""
     if context is None:
@@ -168,7 +273,8 @@ def _register(command, func, context=None, kwargs={}):
             )
         )
 
-    commands.append((pattern, func, kwargs))
+    with _commands_lock:
+        commands.append((pattern, func, kwargs))
 
 
 class Pattern:
@@ -263,7 +369,7 @@ class Pattern:
 
     def is_active(self):
         """Return True if a command is active in the current context."""
-        return _match_context(self.pattern_context, current_context)
+        return _match_context(self.pattern_context, get_context())
 
     def ctx_order(self):
         """Return an integer indicating how nested the context is."""
@@ -278,8 +384,6 @@ class Pattern:
         the pattern does not match.
 
         """
-        global current_context
-
         if len(input_words) < len(self.argnames):
             return None
 
@@ -341,7 +445,7 @@ def when(command, context=None, **kwargs):
 def help():
     """Print a list of the commands you can give."""
     print('Here is a list of the commands you can give:')
-    cmds = sorted(c.orig_pattern for c, _, _ in commands if c.is_active())
+    cmds = sorted(c.orig_pattern for c, _, _ in _available_commands())
     for c in cmds:
         print(c)
 
@@ -353,8 +457,10 @@ def _available_commands():
     corresponds to how deeply nested the context is.
 
     """
+    with _commands_lock:
+        registered = list(commands)
     available_commands = []
-    for c in commands:
+    for c in registered:
         pattern = c[0]
         if pattern.is_active():
             available_commands.append(c)
@@ -366,31 +472,30 @@ def _available_commands():
 
 
 def _handle_command(cmd):
-    """Handle a command typed by the user."""
+    """Handle a command typed by the user.
+
+    Events raised by the command are delivered once it has finished.
+
+    """
     ws = cmd.lower().split()
 
-    for pattern, func, kwargs in _available_commands():
-        args = kwargs.copy()
-        matches = pattern.match(ws)
-        if matches is not None:
-            args.update(matches)
-            func(**args)
-            break
-    else:
-        no_command_matches(cmd)
+    with events.batch():
+        for pattern, func, kwargs in _available_commands():
+            args = kwargs.copy()
+            matches = pattern.match(ws)
+            if matches is not None:
+                args.update(matches)
+                func(**args)
+                break
+        else:
+            no_command_matches(cmd)
     print()
 
 
 def start(help=True):
     """Run the game."""
     if help:
-        # Ugly, but we want to keep the arguments consistent
-        help = globals()['help']
-        qmark = Pattern('help')
-        qmark.prefix = ['?']
-        qmark.orig_pattern = '?'
-        commands.insert(0, (Pattern('help'), help, {}))
-        commands.insert(0, (qmark, help, {}))
+        _register_help()
     while True:
         try:
             cmd = input(prompt()).strip()
@@ -404,6 +509,18 @@ def start(help=True):
         _handle_command(cmd)
 
 
+def _register_help():
+    """Add the built-in help commands, unless they are already registered."""
+    with _commands_lock:
+        if any(func is help for _, func, _ in commands):
+            return
+        qmark = Pattern('help')
+        qmark.prefix = ['?']
+        qmark.orig_pattern = '?'
+        commands.insert(0, (Pattern('help'), help, {}))
+        commands.insert(0, (qmark, help, {}))
+
+
 def say(msg):
     """Print a message.
 
@@ -0,0 +1,449 @@
+"""Measure how a game copes with many players at once.
+
+Simulated players send commands from a weighted mix or a script, either
+in-process through a ThreadedWorld or over a GameServer socket, and the
+latency of every command is recorded. For example::
+
+    python -m misadventure.loadtest mygame --players 50 --commands 200 \\
+        --mix look=5 "take ITEM=2" --words item=lamp,key
+
+The game module is imported to register its commands and rooms, so it must
+not call ``start()`` when imported.
+
+"""
+import argparse
+import importlib
+import math
+import os
+import random
+import re
+import socket
+import sys
+import threading
+import time
+
+from misadventure.server import FRAMED, GameServer
+from misadventure.threaded import ThreadedWorld
+
+_PLACEHOLDER = re.compile(r'\b[A-Z]+\b')
+
+
+class Mix:
+    """Pick commands at random from weighted patterns.
+
+    Patterns use the same notation as ``@when``; each placeholder is filled
+    with a random choice from ``words[placeholder.lower()]``. Latencies are
+    reported per pattern.
+
+    """
+
+    def __init__(self, weights, words=None):
+        if not weights:
+            raise ValueError('A Mix needs at least one command pattern')
+        self.patterns = list(weights)
+        self.weights = [weights[p] for p in self.patterns]
+        self.words = words or {}
+
+    def commands(self, rng):
+        """Yield an endless series of ``(pattern, command)`` pairs."""
+        while True:
+            pattern = rng.choices(self.patterns, self.weights)[0]
+            yield pattern, _PLACEHOLDER.sub(
+                lambda m: rng.choice(self.words.get(m.group().lower(), ['x'])),
+                pattern
+            )
+
+
+class Script:
+    """Send the same commands in order, starting over at the end.
+
+    Latencies are reported per command.
+
+    """
+
+    def __init__(self, commands):
+        self.script = list(commands)
+        if not self.script:
+            raise ValueError('A Script needs at least one command')
+
+    def commands(self, rng):
+        """Yield an endless series of ``(command, command)`` pairs."""
+        while True:
+            for cmd in self.script:
+                yield cmd, cmd
+
+
+class InProcessDriver:
+    """Send commands to a ThreadedWorld in this process."""
+
+    #: What the memory samples of this process cover
+    memory_scope = 'the game and the players'
+
+    def __init__(self, room=None, max_workers=None):
+        self.room = room
+        self.max_workers = max_workers
+        self.world = None
+
+    def open(self, players):
+        self.world = ThreadedWorld(self.max_workers or players)
+
+    def connect(self, player_id):
+        self.world.connect(player_id, self.room)
+        return _InProcessClient(self.world, player_id)
+
+    def close(self):
+        self.world.shutdown()
+
+
+class _InProcessClient:
+    def __init__(self, world, player_id):
+        self.world = world
+        self.player_id = player_id
+
+    def send(self, cmd):
+        return self.world.handle(self.player_id, cmd)
+
+    def close(self):
+        self.world.disconnect(self.player_id)
+
+
+class SocketDriver:
+    """Send commands over localhost sockets.
+
+    If no address is given a GameServer is started in this process, so its
+    memory use shows up in the report. A server at another address runs in
+    another process, so memory is not measured.
+
+    """
+
+    def __init__(self, address=None, room=None, timeout=30.0):
+        self.address = address
+        self.room = room
+        self.timeout = timeout
+        self.server = None
+        self.memory_scope = None
+
+    def open(self, players):
+        if self.address is None:
+            self.server = GameServer(room=self.room, backlog=max(players, 5))
+            self.server.start()
+            self.address = self.server.server_address
+            self.memory_scope = 'the game server and the players'
+
+    def connect(self, player_id):
+        return _SocketClient(self.address, self.timeout)
+
+    def close(self):
+        if self.server is not None:
+            self.server.stop()
+
+
+class _SocketClient:
+    """Talk to a GameServer using its length-prefixed replies.
+
+    Every read times out after `timeout` seconds. After any failure the
+    connection may be out of step, so later commands fail straight away.
+
+    """
+
+    def __init__(self, address, timeout):
+        self.sock = socket.create_connection(address, timeout)
+        self.file = self.sock.makefile('rb')
+        self.broken = False
+        try:
+            self.sock.sendall(FRAMED.encode('utf-8') + b'\n')
+            # Skip the prompt sent on connecting, up to the echoed FRAMED line
+            while not self._readline().endswith(FRAMED.encode('utf-8') + b'\n'):
+                pass
+        except Exception:
+            self.close()
+            raise
+
+    def send(self, cmd):
+        if '\n' in cmd:
+            raise ValueError('Commands cannot contain newlines: %r' % cmd)
+        if self.broken:
+            raise ConnectionError('The connection failed on an earlier command')
+        try:
+            self.sock.sendall(cmd.encode('utf-8') + b'\n')
+            size = int(self._readline())
+            data = self.file.read(size)
+            if len(data) < size:
+                raise ConnectionError('The server closed the connection')
+        except Exception:
+            self.broken = True
+            raise
+        return data.decode('utf-8')
+
+    def _readline(self):
+        line = self.file.readline()
+        if not line:
+            raise ConnectionError('The server closed the connection')
+        return line
+
+    def close(self):
+        self.file.close()
+        self.sock.close()
+
+
+def percentile(values, p):
+    """Return the `p`th percentile of sorted `values`, by nearest rank."""
+    if not values:
+        return None
+    rank = max(1, math.ceil(p / 100.0 * len(values)))
+    return values[rank - 1]
+
+
+def memory_usage():
+    """Return the resident memory of this process in bytes.
+
+    Return ``(size, peak)``, where `peak` is True if only the largest size so
+    far is available on this platform, rather than the current one.
+
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE'), False
+    except (OSError, ValueError):
+        import resource
+        size = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        if sys.platform != 'darwin':
+            size *= 1024
+        return size, True
+
+
+class Report:
+    """The results of a load test."""
+
+    def __init__(self, players):
+        self.players = players
+        self.latencies = {}
+        self.errors = {}
+        #: The first error message seen for each pattern
+        self.error_samples = {}
+        #: ``(seconds, bytes)`` samples, and what they cover
+        self.memory = []
+        self.memory_scope = None
+        self.memory_peak = False
+        self.elapsed = 0.0
+
+    @property
+    def total(self):
+        return sum(len(v) for v in self.latencies.values())
+
+    @property
+    def throughput(self):
+        """Commands handled per second."""
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def format(self):
+        """Return the report as a table of text."""
+        lines = [
+            '%d players, %d commands in %.2fs: %.1f commands/s' % (
+                self.players, self.total, self.elapsed, self.throughput
+            ),
+            '',
+            '%-30s %8s %8s %9s %9s %9s' % (
+                'pattern', 'count', 'errors', 'p50 ms', 'p95 ms', 'p99 ms'
+            ),
+        ]
+        for label in sorted(set(self.latencies) | set(self.errors)):
+            values = sorted(self.latencies.get(label, []))
+            lines.append('%-30s %8d %8d %9s %9s %9s' % (
+                label[:30],
+                len(values),
+                self.errors.get(label, 0),
+                *(_ms(percentile(values, p)) for p in (50, 95, 99))
+            ))
+        if self.error_samples:
+            lines += ['', 'errors:']
+            lines += [
+                '  %s: %s' % (label, message)
+                for label, message in sorted(self.error_samples.items())
+            ]
+        lines.append('')
+        if self.memory_scope is None:
+            lines.append('memory: not measured, the game server runs in another process')
+        elif self.memory:
+            start, end = self.memory[0][1], self.memory[-1][1]
+            peak = max(rss for _, rss in self.memory)
+            kind = 'peak resident size' if self.memory_peak else 'resident size'
+            lines += [
+                'memory of %s (%s): %s at start, %s at end (%+.1f MiB), %s peak' % (
+                    self.memory_scope, kind,
+                    _mib(start), _mib(end), (end - start) / 2 ** 20, _mib(peak)
+                ),
+                '  ' + '  '.join('%.1fs:%s' % (t, _mib(rss)) for t, rss in self.memory),
+            ]
+        return '\n'.join(lines)
+
+
+def _ms(seconds):
+    return '-' if seconds is None else '%.2f' % (seconds * 1000)
+
+
+def _mib(size):
+    return '%.1fMiB' % (size / 2 ** 20)
+
+
+def run(driver, workload, players=10, commands=100, duration=None,
+        seed=None, sample_interval=1.0):
+    """Run a load test and return a Report.
+
+    Each of the `players` sends `commands` commands from `workload` (a Mix or
+    a Script) one after another, stopping early once `duration` seconds have
+    passed if it is given.
+
+    Players that can't connect send nothing, and are counted as errors of
+    the ``connect`` pattern.
+
+    """
+    report = Report(players)
+    lock = threading.Lock()
+    stop = threading.Event()
+    driver.open(players)
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    report.memory_scope = driver.memory_scope
+
+    def sample():
+        size, report.memory_peak = memory_usage()
+        report.memory.append((time.perf_counter() - started, size))
+
+    def sample_memory():
+        while True:
+            sample()
+            if stop.wait(sample_interval):
+                break
+        sample()
+
+    def play(player_id):
+        rng = random.Random(None if seed is None else seed + player_id)
+        latencies, errors, samples = {}, {}, {}
+
+        def failed(label, e):
+            errors[label] = errors.get(label, 0) + 1
+            samples.setdefault(label, '%s: %s' % (type(e).__name__, e))
+
+        try:
+            client = driver.connect(player_id)
+        except Exception as e:
+            failed('connect', e)
+            client = None
+        if client is not None:
+            try:
+                for _, (label, cmd) in zip(range(commands), workload.commands(rng)):
+                    if deadline and time.perf_counter() >= deadline:
+                        break
+                    begin = time.perf_counter()
+                    try:
+                        client.send(cmd)
+                    except Exception as e:
+                        failed(label, e)
+                        continue
+                    latencies.setdefault(label, []).append(time.perf_counter() - begin)
+            finally:
+                client.close()
+        with lock:
+            for label, values in latencies.items():
+                report.latencies.setdefault(label, []).extend(values)
+            for label, count in errors.items():
+                report.errors[label] = report.errors.get(label, 0) + count
+            for label, message in samples.items():
+                report.error_samples.setdefault(label, message)
+
+    sampler = threading.Thread(target=sample_memory, daemon=True)
+    if report.memory_scope is not None:
+        sampler.start()
+    threads = [
+        threading.Thread(target=play, args=(i,), daemon=True)
+        for i in range(players)
+    ]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        report.elapsed = time.perf_counter() - started
+        stop.set()
+        if sampler.is_alive():
+            sampler.join()
+        driver.close()
+    return report
+
+
+def _weights(values):
+    weights = {}
+    for value in values:
+        pattern, _, weight = value.rpartition('=')
+        if not pattern:
+            pattern, weight = weight, '1'
+        weights[pattern] = float(weight)
+    return weights
+
+
+def _words(values):
+    return {
+        name.lower(): choices.split(',')
+        for name, _, choices in (v.partition('=') for v in values)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m misadventure.loadtest',
+        description='Load test a misadventure game with simulated players.'
+    )
+    parser.add_argument('game', help='module that sets up the game')
+    parser.add_argument('--players', type=int, default=10)
+    parser.add_argument('--commands', type=int, default=100,
+                        help='commands sent by each player')
+    parser.add_argument('--duration', type=float,
+                        help='stop after this many seconds')
+    parser.add_argument('--room', help='name of the room players start in')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--mix', nargs='+', metavar='PATTERN=WEIGHT',
+                       help='weighted command patterns, e.g. "take ITEM=2"')
+    group.add_argument('--script', nargs='+', metavar='COMMAND',
+                       help='commands each player sends in order')
+    parser.add_argument('--words', nargs='+', default=[], metavar='NAME=A,B',
+                        help='choices for placeholders in --mix patterns')
+    parser.add_argument('--socket', nargs='?', const='', metavar='HOST:PORT',
+                        help='play over a socket, starting a server if no address is given')
+    parser.add_argument('--timeout', type=float, default=30.0,
+                        help='seconds to wait for each reply over a socket')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--sample-interval', type=float, default=1.0,
+                        help='seconds between memory samples')
+    args = parser.parse_args(argv)
+
+    importlib.import_module(args.game)
+    if args.script:
+        workload = Script(args.script)
+    else:
+        workload = Mix(_weights(args.mix or ['look']), _words(args.words))
+
+    if args.socket is None:
+        driver = InProcessDriver(args.room)
+    elif args.socket:
+        host, _, port = args.socket.rpartition(':')
+        driver = SocketDriver((host or '127.0.0.1', int(port)), args.room, args.timeout)
+    else:
+        driver = SocketDriver(room=args.room, timeout=args.timeout)
+
+    report = run(
+        driver, workload,
+        players=args.players,
+        commands=args.commands,
+        duration=args.duration,
+        seed=args.seed,
+        sample_interval=args.sample_interval
+    )
+    print(report.format())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,85 @@
 from copy import deepcopy
 
+import misadventure.events as events
 from misadventure.bag import Bag
-from misadventure.lib import InvalidState, InvalidDirection, InvalidCommand, Collection
+from misadventure.lib import InvalidState, InvalidDirection, InvalidCommand, Collection, _leaf_locked
+from misadventure.template import Template, render, snapshot
 
 
 class RoomState:
+    """One way a room can look.
+
+    The description may be a plain string or a Template, which can refer to
+    the items in the state's bag, its exits and attributes of the room.
+
+    """
+
     def __init__(self, description: str = ''):
         self.names = Collection()
-        self.description = description if not description or len(description) == 0 else description.strip()
+        if isinstance(description, Template):
+            self.description = description
+        else:
+            self.description = description if not description or len(description) == 0 else description.strip()
 
         self._directions = {}
         self.bag = Bag()
 
     def __str__(self):
-        return self.description
+        return self.describe()
+
+    def describe(self, room=None):
+        """Return the description of this state as seen in `room`.
+
+        A Template description is only rendered again when the bag, the exits
+        or one of the attributes it uses has changed. Lists, sets and dicts are
+        compared by their contents; changes made inside any other mutable
+        attribute are not noticed, so replace it rather than changing it.
+
+        """
+        if not isinstance(self.description, Template):
+            return self.description
+        return render(
+            self.description,
+            self,
+            lambda name: self._template_value(name, room),
+            lambda name: self._template_stamp(name, room)
+        )
+
+    def _template_value(self, name, room):
+        if name == 'items':
+            return self.bag.snapshot()
+        if name == 'exits':
+            return self.exits()
+        if room is not None and hasattr(room, name):
+            return getattr(room, name)
+        return getattr(self, name, None)
+
+    def _template_stamp(self, name, room):
+        if name == 'items':
+            return id(self.bag), self.bag.version
+        if name == 'exits':
+            return self.__dict__.get('_exits_version', 0)
+        return snapshot(self._template_value(name, room))
+
+    def _exits_changed(self):
+        self.__dict__['_exits_version'] = self.__dict__.get('_exits_version', 0) + 1
 
     def add_names(self, *names):
         self.names.add(names)
 
     def add_direction(self, forward, reverse):
-        for direction in (forward, reverse):
-            if not direction.islower():
-                raise InvalidCommand('Invalid direction %r: directions must be all lowercase.')
-            if self._directions.keys().__contains__(direction):
-                raise KeyError('Direction %r is already defined.')
+        with _leaf_locked(self):
+            for direction in (forward, reverse):
+                if not direction.islower():
+                    raise InvalidCommand('Invalid direction %r: directions must be all lowercase.')
+                if self._directions.keys().__contains__(direction):
+                    raise KeyError('Direction %r is already defined.')
 
-            self._directions[forward] = reverse
-            self._directions[reverse] = forward
+                self._directions[forward] = reverse
+                self._directions[reverse] = forward
 
-            setattr(self, forward, None)
-            setattr(self, reverse, None)
+                setattr(self, forward, None)
+                setattr(self, reverse, None)
 
     def exit(self, direction):
         """Get the exit of a room in a given direction.
@@ -54,10 +104,19 @@ class RoomState:
                     ' where <opposite> is the return direction.'
                 )
             reverse = self._directions[name]
-            object.__setattr__(self, name, value)
-            object.__setattr__(value, reverse, self)
+            with _leaf_locked(self, value):
+                object.__setattr__(self, name, value)
+                object.__setattr__(value, reverse, self)
+                self._exits_changed()
+                value._exits_changed()
+            events.emit(events.ExitCreated(self, name, value))
+            events.emit(events.ExitCreated(value, reverse, self))
         else:
             object.__setattr__(self, name, value)
+            if name in self.__dict__.get('_directions', ()):
+                self._exits_changed()
+            if name == 'bag' and isinstance(value, Bag):
+                events.add_parent(value, self)
 
     @property
     def directions(self):
@@ -73,12 +132,14 @@ class Room(RoomState):
         self._states = {}
         
     def __str__(self, state=None):
-        if not state:
-            return str(self._current_state)
-        return str(self._states[state])
+        current = self._states[state] if state else self._current_state
+        if current is None:
+            return str(current)
+        return current.describe(self)
 
     def add_state(self, name: str, state: RoomState, pass_directions=False):
         self._states[name] = state
+        events.add_parent(state, self)
 
     def get_state(self, name: str):
         if name in self._states:
@@ -89,7 +150,10 @@ class Room(RoomState):
         state = self.get_state(name)
         if not state:
             return False
+        old = self._current_state
         self._current_state = state
+        if state is not old:
+            events.emit(events.StateChanged(self, old, state, name))
         return True
 
     @property
@@ -0,0 +1,81 @@
+import socketserver
+import threading
+
+import misadventure.lib as lib
+from misadventure.session import Session
+
+#: Sent as the first line to switch a connection to length-prefixed replies.
+#: Commands may only contain letters, so this can't clash with one.
+FRAMED = '#framed'
+
+
+class _GameHandler(socketserver.StreamRequestHandler):
+    """Play the game over one connection, a line at a time."""
+
+    def handle(self):
+        player = Session('%s:%s' % self.client_address[:2], self.server.room)
+        framed = False
+        self.wfile.write(lib.prompt().encode('utf-8'))
+        for line in self.rfile:
+            cmd = line.decode('utf-8', 'replace').strip()
+            if cmd == FRAMED and not framed:
+                framed = True
+                self.wfile.write(FRAMED.encode('utf-8') + b'\n')
+                continue
+            output = player.handle(cmd) if cmd else ''
+            if player.closed:
+                break
+            self._reply(output, framed)
+
+    def _reply(self, output, framed):
+        if framed:
+            data = output.encode('utf-8')
+            self.wfile.write(b'%d\n' % len(data) + data)
+        else:
+            self.wfile.write((output + lib.prompt()).encode('utf-8'))
+
+
+class GameServer(socketserver.ThreadingTCPServer):
+    """A socket front-end that gives every connection its own session.
+
+    Each connection is handled on its own thread. The server sends the
+    prompt, then for each line received it sends the command's output
+    followed by the prompt again. Sending ``quit`` closes the connection.
+
+    Programs that talk to the server can send ``FRAMED`` as their first line,
+    which the server echoes back on a line of its own. From then on each
+    reply is the length of the output in bytes on a line of its own,
+    followed by the output, with no prompt.
+
+    `backlog` is how many connections may wait to be accepted.
+
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address=('127.0.0.1', 0), room=None, backlog=5):
+        # Read by server_activate() inside TCPServer.__init__
+        self.request_queue_size = backlog
+        super().__init__(address, _GameHandler)
+        self.room = room
+
+    def start(self):
+        """Serve connections on a background thread, and return the thread."""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """Stop serving and close the listening socket."""
+        self.shutdown()
+        self.server_close()
+
+
+def serve(host='127.0.0.1', port=4000, room=None):
+    """Run the game on a socket until interrupted."""
+    with GameServer((host, port), room) as server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
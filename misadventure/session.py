@@ -0,0 +1,124 @@
+import io
+import sys
+import threading
+from contextlib import contextmanager
+
+from misadventure.lib import _bound_context, _handle_command, get_context
+
+#: All rooms known to the game, keyed by name
+rooms = {}
+
+_local = threading.local()
+_stdout_guard = threading.Lock()
+
+
+class _ThreadOutput:
+    """Stand-in for sys.stdout that sends writes to a per-thread buffer.
+
+    Threads that are not capturing output write to the wrapped stream.
+
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        buffer = getattr(_local, 'output', None)
+        if buffer is None:
+            return self.stream.write(text)
+        return buffer.write(text)
+
+    def flush(self):
+        if getattr(_local, 'output', None) is None:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+@contextmanager
+def _captured_output():
+    """Capture everything printed by the current thread into a StringIO."""
+    with _stdout_guard:
+        if not isinstance(sys.stdout, _ThreadOutput):
+            sys.stdout = _ThreadOutput(sys.stdout)
+    outer = getattr(_local, 'output', None)
+    _local.output = io.StringIO()
+    try:
+        yield _local.output
+    finally:
+        _local.output = outer
+
+
+class Session:
+    """A single player's view of the game.
+
+    A session tracks the name of the room the player is in and the command
+    context they are using, so that several players can share one set of
+    rooms and commands. Sessions only hold plain data so that they can be
+    passed between processes.
+
+    """
+
+    def __init__(self, session_id, room=None, context=None):
+        self.id = session_id
+        self.room = room
+        self.context = context
+        self.closed = False
+        self.data = {}
+
+    def __repr__(self):
+        return '%s(%r, room=%r)' % (
+            type(self).__name__,
+            self.id,
+            self.room
+        )
+
+    def handle(self, cmd):
+        """Handle a command on behalf of this session.
+
+        Return everything the command printed. If the command quits the game
+        then the session is marked as closed instead of exiting.
+
+        Sessions may be handled from several threads at once, as long as each
+        session is only handled by one thread at a time.
+
+        """
+        outer = getattr(_local, 'session', None)
+        _local.session = self
+        try:
+            with _bound_context(self.context), _captured_output() as output:
+                try:
+                    _handle_command(cmd)
+                except SystemExit:
+                    self.closed = True
+                finally:
+                    self.context = get_context()
+        finally:
+            _local.session = outer
+        return output.getvalue()
+
+
+def add_room(name, room):
+    """Register a room under the given name, and return it."""
+    rooms[name] = room
+    return room
+
+
+def get_session():
+    """Get the session whose command is currently being handled."""
+    return getattr(_local, 'session', None)
+
+
+def get_room(name=None):
+    """Get a room by name.
+
+    If no name is given, return the room the current session is in.
+
+    """
+    if name is None:
+        session = get_session()
+        if session is None:
+            return None
+        name = session.room
+    return rooms.get(name)
@@ -0,0 +1,273 @@
+import collections
+import multiprocessing
+import os
+import pickle
+import queue
+import traceback
+import zlib
+
+import misadventure.session as session
+from misadventure.session import Session
+
+
+class InvalidShard(Exception):
+    """A room or session could not be routed to a shard."""
+
+
+class ShardError(Exception):
+    """A command failed in a shard worker, or the worker died."""
+
+
+def shard_for(name, shards):
+    """Return the index of the shard that owns the room called `name`.
+
+    The hash is stable between processes and runs, unlike ``hash()``.
+
+    """
+    return zlib.crc32(name.encode('utf-8')) % shards
+
+
+def _serve_shard(owned, known, inbox, outbox):
+    """Main loop of a shard worker process.
+
+    The worker only keeps the rooms it owns. Sessions are kept here for as
+    long as they stay within those rooms; when a command moves a session into
+    a room owned by another shard the session is sent back with the reply so
+    it can be handed off.
+
+    If a handler raises, moves the session to a room that is not in `known`,
+    or leaves something in the session that can't be pickled for the move,
+    the session stays where it was and the reply carries the error.
+
+    Replies are pickled here rather than by the queue, whose feeder thread
+    would otherwise drop a reply that can't be pickled without telling
+    anyone.
+
+    """
+    for name in list(session.rooms):
+        if name not in owned:
+            del session.rooms[name]
+
+    sessions = {}
+    while True:
+        message = inbox.get()
+        if message is None:
+            break
+        kind = message[0]
+        if kind == 'adopt':
+            player = pickle.loads(message[1])
+            sessions[player.id] = player
+            continue
+        if kind == 'leave':
+            sessions.pop(message[1], None)
+            continue
+
+        _, index, session_id, cmd = message
+        player = sessions[session_id]
+        room = player.room
+        output, moved, error = '', None, None
+        try:
+            output = player.handle(cmd)
+        except Exception:
+            error = ShardError, traceback.format_exc()
+            player.room = room
+        if player.room not in known:
+            error = InvalidShard, '%r is not a registered room' % player.room
+            player.room = room
+        if player.closed or player.room not in owned:
+            moved = sessions.pop(session_id)
+        try:
+            reply = pickle.dumps((index, session_id, output, moved, error))
+        except Exception:
+            error = ShardError, 'Session %r could not be sent back from its shard:\n%s' % (
+                session_id, traceback.format_exc()
+            )
+            if player.closed:
+                moved = Session(session_id, room)
+                moved.closed = True
+            else:
+                player.room = room
+                sessions[session_id] = player
+                moved = None
+            reply = pickle.dumps((index, session_id, output, moved, error))
+        outbox.put(reply)
+
+
+class ShardedWorld:
+    """Run the game across a pool of worker processes.
+
+    Rooms registered with ``misadventure.session.add_room()`` are partitioned
+    between the shards, and each player session lives on the shard that owns
+    its current room. Commands for sessions on different shards are handled
+    in parallel by ``handle_many()``.
+
+    Workers are forked, so all rooms and commands must be set up before
+    calling ``start()``.
+
+    """
+
+    #: Seconds to wait for a reply before checking that the workers are alive
+    poll_interval = 1.0
+
+    def __init__(self, shards=None, placement=None):
+        self.shards = shards or os.cpu_count() or 1
+        self.placement = dict(placement or {})
+        self._mp = multiprocessing.get_context('fork')
+        self._inboxes = []
+        self._workers = []
+        self._outbox = None
+        self._routes = {}
+
+    def owner(self, room):
+        """Return the index of the shard that owns the named room."""
+        if room not in session.rooms:
+            raise InvalidShard('%r is not a registered room' % room)
+        if room in self.placement:
+            return self.placement[room] % self.shards
+        return shard_for(room, self.shards)
+
+    def start(self):
+        """Fork the shard workers."""
+        known = frozenset(session.rooms)
+        owned = [set() for _ in range(self.shards)]
+        for name in known:
+            owned[self.owner(name)].add(name)
+
+        self._outbox = self._mp.Queue()
+        for rooms in owned:
+            inbox = self._mp.Queue()
+            worker = self._mp.Process(
+                target=_serve_shard,
+                args=(rooms, known, inbox, self._outbox),
+                daemon=True
+            )
+            worker.start()
+            self._inboxes.append(inbox)
+            self._workers.append(worker)
+
+    def stop(self):
+        """Stop the shard workers and wait for them to exit."""
+        for inbox in self._inboxes:
+            inbox.put(None)
+        for worker in self._workers:
+            worker.join()
+        self._inboxes = []
+        self._workers = []
+        self._routes = {}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def connect(self, session_id, room, context=None):
+        """Add a player session starting in the named room."""
+        if session_id in self._routes:
+            raise InvalidShard('Session %r is already connected' % session_id)
+        self._adopt(Session(session_id, room, context))
+
+    def disconnect(self, session_id):
+        """Remove a player session from its shard."""
+        if session_id not in self._routes:
+            raise InvalidShard('Session %r is not connected' % session_id)
+        shard = self._routes.pop(session_id)
+        self._inboxes[shard].put(('leave', session_id))
+
+    def sessions(self):
+        """Return a dict of connected session ids to shard indexes."""
+        return dict(self._routes)
+
+    def handle(self, session_id, cmd):
+        """Handle a single command and return its output."""
+        return self.handle_many([(session_id, cmd)])[0]
+
+    def handle_many(self, requests):
+        """Handle a list of ``(session_id, command)`` pairs.
+
+        Commands for different sessions run concurrently, while the commands
+        of any one session run in the order they were given. Return a list of
+        outputs in the same order as the requests.
+
+        If a command fails, no further commands are sent; the ones already
+        running are waited for and then the first error is raised.
+
+        """
+        for session_id, _ in requests:
+            if session_id not in self._routes:
+                raise InvalidShard('Session %r is not connected' % session_id)
+
+        results = [None] * len(requests)
+        queued = collections.deque(enumerate(requests))
+        busy = set()
+        error = None
+        while busy or (queued and error is None):
+            blocked = collections.deque()
+            while queued and error is None:
+                index, (session_id, cmd) = queued.popleft()
+                if session_id in busy:
+                    blocked.append((index, (session_id, cmd)))
+                    continue
+                if session_id not in self._routes:
+                    # The session quit earlier in this batch
+                    error = InvalidShard('Session %r is not connected' % session_id)
+                    break
+                busy.add(session_id)
+                self._inboxes[self._routes[session_id]].put(
+                    ('command', index, session_id, cmd)
+                )
+            queued = blocked
+            if not busy:
+                break
+
+            index, session_id, output, moved, failure = self._reply()
+            results[index] = output
+            busy.discard(session_id)
+            if failure is not None and error is None:
+                error = failure[0](failure[1])
+            if moved is not None:
+                del self._routes[session_id]
+                if not moved.closed:
+                    try:
+                        self._adopt(moved)
+                    except ShardError as e:
+                        error = error or e
+        if error is not None:
+            raise error
+        return results
+
+    def _reply(self):
+        """Wait for the next reply from a worker.
+
+        Raise ShardError if a worker has died, since its replies will never
+        come.
+
+        """
+        while True:
+            try:
+                return pickle.loads(self._outbox.get(timeout=self.poll_interval))
+            except queue.Empty:
+                pass
+            for index, worker in enumerate(self._workers):
+                if not worker.is_alive():
+                    raise ShardError(
+                        'Shard %d exited with code %r' % (index, worker.exitcode)
+                    )
+
+    def _adopt(self, player):
+        """Hand a session to the shard that owns its room.
+
+        The session is pickled before it is routed, so a session that can't be
+        sent raises ShardError instead of being dropped by the queue.
+
+        """
+        shard = self.owner(player.room)
+        try:
+            data = pickle.dumps(player)
+        except Exception as e:
+            raise ShardError('Session %r could not be sent to shard %d: %s' % (
+                player.id, shard, e
+            ))
+        self._routes[player.id] = shard
+        self._inboxes[shard].put(('adopt', data))
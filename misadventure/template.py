@@ -0,0 +1,180 @@
+import re
+
+_TAG = re.compile(r'\{\{|\}\}|\{([^{}]*)\}')
+_NAME = re.compile(r'[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class InvalidTemplate(Exception):
+    """A description template could not be parsed."""
+
+
+class Template:
+    """A description with placeholders that is parsed once and rendered often.
+
+    Templates understand these tags:
+
+    * ``{name}`` is replaced by the attribute `name` of the room (or item)
+    * ``{items}`` lists the items in the room's bag
+    * ``{exits}`` lists the directions that lead out of the room
+    * ``{if name}...{else}...{end}`` shows one of two parts depending on
+      whether `name` is true; ``{if not name}`` is also allowed
+    * ``{{`` and ``}}`` are literal braces
+
+    """
+
+    def __init__(self, source):
+        self.source = source
+        inputs = []
+        self._render, ended = _compile_block(_tokens(source), inputs)
+        if ended is not None:
+            raise InvalidTemplate('Unexpected {%s} in template %r' % (ended, source))
+        #: The names this template reads, in the order they first appear
+        self.inputs = tuple(inputs)
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, self.source)
+
+    def render(self, value):
+        """Render the template, calling `value(name)` to get each input."""
+        return self._render(value)
+
+
+def render(template, owner, value, stamp=None):
+    """Render `template` for `owner`, reusing the last result if possible.
+
+    `value(name)` returns the value of an input. `stamp(name)` returns
+    something that compares equal for as long as that input is unchanged; it
+    defaults to a ``snapshot()`` of the value. The last rendering is kept on
+    `owner`, and the template is only rendered again when one of its inputs
+    has changed.
+
+    """
+    stamp = stamp or (lambda name: snapshot(value(name)))
+    key = (template, tuple(stamp(name) for name in template.inputs))
+    cached = owner.__dict__.get('_rendered')
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    text = template.render(value)
+    owner.__dict__['_rendered'] = (key, text)
+    return text
+
+
+def snapshot(value):
+    """Return a copy of `value` that won't change if `value` is changed in place.
+
+    Lists, tuples, sets and dicts are copied one level deep; anything else is
+    returned as it is, so it must be replaced rather than changed to be
+    noticed.
+
+    """
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset, frozenset(value)
+    if isinstance(value, dict):
+        return dict, tuple(value.items())
+    return value
+
+
+def _format(value):
+    """Turn an input value into text."""
+    if value is None:
+        return ''
+    if isinstance(value, (set, frozenset)):
+        return ', '.join(sorted(str(v) for v in value))
+    if isinstance(value, (list, tuple)):
+        return ', '.join(str(v) for v in value)
+    return str(value)
+
+
+def _tokens(source):
+    """Split a template into ``(kind, argument)`` tokens."""
+    pos = 0
+    for match in _TAG.finditer(source):
+        if match.start() > pos:
+            yield 'text', source[pos:match.start()]
+        pos = match.end()
+        tag = match.group()
+        if tag in ('{{', '}}'):
+            yield 'text', tag[0]
+            continue
+
+        words = match.group(1).split()
+        if words in (['else'], ['end']):
+            yield words[0], None
+        elif len(words) == 1 and _NAME.match(words[0]):
+            yield 'name', words[0]
+        elif words[:1] == ['if'] and len(words) in (2, 3) and _NAME.match(words[-1]):
+            if len(words) == 3 and words[1] != 'not':
+                raise InvalidTemplate('Invalid tag %r in template %r' % (tag, source))
+            yield 'if', (len(words) == 3, words[-1])
+        else:
+            raise InvalidTemplate('Invalid tag %r in template %r' % (tag, source))
+    if pos < len(source):
+        yield 'text', source[pos:]
+
+
+def _compile_block(tokens, inputs):
+    """Compile tokens up to the next {else} or {end}.
+
+    Return the render function and the tag that ended the block, or None if
+    the tokens ran out.
+
+    """
+    parts = []
+    for kind, arg in tokens:
+        if kind in ('else', 'end'):
+            return _join(parts), kind
+        if kind == 'text':
+            if parts and isinstance(parts[-1], str):
+                parts[-1] += arg
+            else:
+                parts.append(arg)
+            continue
+
+        if kind == 'name':
+            name = arg
+        else:
+            negate, name = arg
+        if name not in inputs:
+            inputs.append(name)
+        if kind == 'name':
+            parts.append(_substitute(name))
+            continue
+
+        body, ended = _compile_block(tokens, inputs)
+        other = _join([])
+        if ended == 'else':
+            other, ended = _compile_block(tokens, inputs)
+            if ended == 'else':
+                raise InvalidTemplate('{if %s} has more than one {else}' % name)
+        if ended != 'end':
+            raise InvalidTemplate('{if %s} is missing its {end}' % name)
+        parts.append(_conditional(name, negate, body, other))
+    return _join(parts), None
+
+
+def _substitute(name):
+    return lambda value: _format(value(name))
+
+
+def _conditional(name, negate, body, other):
+    def render(value):
+        if bool(value(name)) != negate:
+            return body(value)
+        return other(value)
+
+    return render
+
+
+def _join(parts):
+    """Make a render function that concatenates literal text and sub-parts."""
+    if not parts:
+        return lambda value: ''
+    if len(parts) == 1 and isinstance(parts[0], str):
+        text = parts[0]
+        return lambda value: text
+    return lambda value: ''.join(
+        p if isinstance(p, str) else p(value)
+        for p in parts
+    )
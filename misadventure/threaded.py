@@ -0,0 +1,113 @@
+import collections
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from misadventure.session import Session
+
+
+class InvalidSession(Exception):
+    """A session id is unknown or already in use."""
+
+
+class ThreadedWorld:
+    """Handle the commands of many sessions on a pool of threads.
+
+    Commands for different sessions run concurrently, so a handler that
+    blocks on a file or database only holds up its own player. The commands
+    of any one session always run one at a time and in order.
+
+    Handlers that change shared rooms or bags should hold their locks with
+    ``misadventure.lib.locked()``, passing every object the command touches
+    in a single call and never nesting ``locked()`` blocks. Library methods
+    such as ``Bag.add()`` are safe to call while holding them.
+
+    """
+
+    def __init__(self, max_workers=None):
+        self._executor = ThreadPoolExecutor(max_workers)
+        self._guard = threading.Lock()
+        self._sessions = {}
+        self._pending = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+    def shutdown(self, wait=True):
+        """Stop the thread pool once all submitted commands have run."""
+        self._executor.shutdown(wait=wait)
+
+    def connect(self, session_id, room, context=None):
+        """Add a player session starting in the named room."""
+        with self._guard:
+            if session_id in self._sessions:
+                raise InvalidSession('Session %r is already connected' % session_id)
+            player = self._sessions[session_id] = Session(session_id, room, context)
+            self._pending[session_id] = collections.deque()
+        return player
+
+    def disconnect(self, session_id):
+        """Remove a player session."""
+        with self._guard:
+            self._sessions.pop(session_id, None)
+            if not self._pending.get(session_id):
+                self._pending.pop(session_id, None)
+
+    def sessions(self):
+        """Return a dict of connected session ids to their sessions."""
+        with self._guard:
+            return dict(self._sessions)
+
+    def submit(self, session_id, cmd):
+        """Queue a command for a session and return a Future of its output."""
+        future = Future()
+        with self._guard:
+            if session_id not in self._sessions:
+                raise InvalidSession('Session %r is not connected' % session_id)
+            queue = self._pending[session_id]
+            queue.append((cmd, future))
+            if len(queue) > 1:
+                # A worker is already draining this session's commands
+                return future
+        self._executor.submit(self._drain, session_id)
+        return future
+
+    def handle(self, session_id, cmd):
+        """Handle a single command and return its output."""
+        return self.submit(session_id, cmd).result()
+
+    def handle_many(self, requests):
+        """Handle a list of ``(session_id, command)`` pairs.
+
+        Return a list of outputs in the same order as the requests.
+
+        """
+        futures = [self.submit(session_id, cmd) for session_id, cmd in requests]
+        return [future.result() for future in futures]
+
+    def _drain(self, session_id):
+        """Run the queued commands of a session until there are none left."""
+        with self._guard:
+            player = self._sessions.get(session_id)
+            queue = self._pending[session_id]
+        while True:
+            cmd, future = queue[0]
+            if future.set_running_or_notify_cancel():
+                try:
+                    if player is None or player.closed:
+                        raise InvalidSession('Session %r is not connected' % session_id)
+                    future.set_result(player.handle(cmd))
+                except Exception as e:
+                    future.set_exception(e)
+            with self._guard:
+                queue.popleft()
+                if not queue:
+                    current = self._sessions.get(session_id)
+                    if player is not None and player.closed and current is player:
+                        del self._sessions[session_id]
+                        current = None
+                    if current is None and self._pending.get(session_id) is queue:
+                        del self._pending[session_id]
+                    return